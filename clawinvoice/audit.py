@@ -0,0 +1,285 @@
+"""Incremental integrity audit for the hash-chained JSONL ledger.
+
+A successful audit appends a checkpoint (byte offset, record count, chain
+hash) to a sidecar file next to the ledger.  The next audit starts from the
+last checkpoint and only re-hashes records appended since, so its cost
+scales with new data rather than ledger size.  When ``LEDGER_AUDIT_KEY`` is
+set, checkpoints are HMAC-signed and unsigned or forged ones are rejected.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import hmac
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any
+
+from clawinvoice import ledger
+from clawinvoice.config import LEDGER_AUDIT_KEY, LEDGER_PATH
+
+
+_HEX64 = re.compile(r"[0-9a-f]{64}")
+
+
+@dataclasses.dataclass(frozen=True)
+class Checkpoint:
+    """A trusted point in the ledger: everything before *offset* is verified."""
+
+    offset: int
+    count: int
+    chain_hash: str
+    created_at: int
+    signature: str | None = None
+
+
+@dataclasses.dataclass
+class AuditResult:
+    """Outcome of a ledger audit.  ``problems`` is empty when the ledger is intact."""
+
+    ok: bool
+    start_offset: int
+    end_offset: int
+    records_checked: int
+    total_records: int
+    chain_hash: str
+    problems: list[str]
+    checkpoint: Checkpoint | None = None
+
+
+# ---------------------------------------------------------------------------
+# Internal helpers
+# ---------------------------------------------------------------------------
+
+def _sign(offset: int, count: int, chain_hash: str, created_at: int, key: str) -> str:
+    payload = json.dumps(
+        {"offset": offset, "count": count, "chain_hash": chain_hash, "created_at": created_at},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hmac.new(key.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def _parse_checkpoint(data: Any) -> Checkpoint:
+    # Checkpoints are trusted input, so types are checked exactly rather
+    # than coerced: no bools, floats, numeric strings or ``null`` hashes.
+    if not isinstance(data, dict):
+        raise ValueError(f"Malformed checkpoint record: {data!r}")
+    for name in ("offset", "count", "created_at"):
+        value = data.get(name)
+        if type(value) is not int or value < 0:
+            raise ValueError(f"Malformed checkpoint record: {data!r}")
+    chain_hash = data.get("chain_hash")
+    if not isinstance(chain_hash, str) or not _HEX64.fullmatch(chain_hash):
+        raise ValueError(f"Malformed checkpoint record: {data!r}")
+    return Checkpoint(
+        offset=data["offset"],
+        count=data["count"],
+        chain_hash=chain_hash,
+        created_at=data["created_at"],
+        signature=data.get("signature"),
+    )
+
+
+def _check_trusted(cp: Checkpoint, key: str | None) -> str | None:
+    """Return a problem string if *cp* cannot be trusted, else None."""
+    if key is None:
+        return None
+    if cp.signature is None:
+        return f"Checkpoint at offset {cp.offset} is unsigned"
+    if not isinstance(cp.signature, str):
+        return f"Checkpoint at offset {cp.offset} has a non-string signature"
+    expected = _sign(cp.offset, cp.count, cp.chain_hash, cp.created_at, key)
+    if not hmac.compare_digest(cp.signature, expected):
+        return f"Checkpoint at offset {cp.offset} has an invalid signature"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def checkpoint_path(path: Path = LEDGER_PATH) -> Path:
+    """Return the checkpoint sidecar file for the ledger at *path*."""
+    return path.with_name(f"{path.stem}.checkpoints.jsonl")
+
+
+def load_checkpoint(path: Path = LEDGER_PATH) -> Checkpoint | None:
+    """Return the most recent checkpoint for the ledger at *path*, or None.
+
+    Raises ``ValueError`` if the last checkpoint line is not a valid
+    checkpoint object.
+    """
+    cp_path = checkpoint_path(path)
+    if not cp_path.exists():
+        return None
+    with cp_path.open("rb") as fh:
+        line = ledger.read_last_line(fh)
+    if not line:
+        return None
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Malformed JSON on last line of {cp_path}") from exc
+    return _parse_checkpoint(data)
+
+
+def write_checkpoint(
+    offset: int,
+    count: int,
+    chain_hash: str,
+    path: Path = LEDGER_PATH,
+    *,
+    key: str | None = LEDGER_AUDIT_KEY,
+) -> Checkpoint:
+    """Append a checkpoint for the ledger at *path*, signing it if *key* is set."""
+    created_at = int(time.time())
+    signature = _sign(offset, count, chain_hash, created_at, key) if key else None
+    cp = Checkpoint(offset, count, chain_hash, created_at, signature)
+    cp_path = checkpoint_path(path)
+    cp_path.parent.mkdir(parents=True, exist_ok=True)
+    with cp_path.open("a") as fh, ledger.locked(fh):
+        fh.write(json.dumps(dataclasses.asdict(cp)) + "\n")
+    return cp
+
+
+def audit_ledger(
+    path: Path = LEDGER_PATH,
+    *,
+    full: bool = False,
+    key: str | None = LEDGER_AUDIT_KEY,
+    checkpoint: bool = True,
+) -> AuditResult:
+    """Verify the ledger's hash chain from the last trusted checkpoint.
+
+    With ``full=True`` the checkpoint is ignored and the whole file is
+    re-hashed.  When the audit passes and new records were checked, a fresh
+    checkpoint is written unless ``checkpoint=False``.
+
+    The chain hash is unkeyed, so when *key* is set a non-empty ledger
+    without a trusted checkpoint is reported as a problem: otherwise
+    deleting the sidecar would let a recomputed chain pass.  Establishing
+    trust on such a ledger requires an explicit ``full=True``.
+    """
+    problems: list[str] = []
+    offset, count, prev_hash = 0, 0, ledger.GENESIS_HASH
+    size = path.stat().st_size if path.exists() else 0
+
+    if not full:
+        # A damaged, untrusted or out-of-range checkpoint is reported and
+        # the audit falls back to a full re-hash, so every field in the
+        # result still describes the file on disk.
+        try:
+            cp = load_checkpoint(path)
+        except ValueError as exc:
+            cp = None
+            problems.append(f"Unreadable checkpoint: {exc}")
+        if cp is not None:
+            untrusted = _check_trusted(cp, key)
+            if untrusted:
+                problems.append(untrusted)
+            elif size < cp.offset:
+                problems.append(
+                    f"Ledger truncated: size {size} is below checkpoint offset {cp.offset}"
+                )
+            else:
+                offset, count, prev_hash = cp.offset, cp.count, cp.chain_hash
+        elif key is not None and size and not problems:
+            problems.append(
+                "No trusted checkpoint for a non-empty ledger; run "
+                "`clawinvoice audit --full` to establish one"
+            )
+
+    start_offset = offset
+    if size == 0:
+        return AuditResult(not problems, 0, 0, 0, 0, prev_hash, problems)
+
+    checked = 0
+    # Shared lock: never observe a half-written append.
+    with path.open("rb") as fh, ledger.locked(fh, shared=True):
+        if offset:
+            # The record ending at the checkpoint must still carry its hash,
+            # otherwise the ledger was rewritten underneath the checkpoint.
+            try:
+                anchor = json.loads(ledger.read_last_line(fh, end=offset))
+            except json.JSONDecodeError:
+                anchor = None
+            anchor_hash = anchor.get(ledger.CHAIN_FIELD) if isinstance(anchor, dict) else None
+            if anchor_hash != prev_hash:
+                problems.append(
+                    f"Record before checkpoint offset {offset} no longer "
+                    f"matches checkpoint hash"
+                )
+
+        # Unchained records before the chain starts are legacy data; they
+        # are only excused when the first chained record is a matching seal.
+        legacy = hashlib.sha256()
+        pending: list[str] = []
+        chained = offset > 0
+
+        fh.seek(offset)
+        for raw in fh:
+            rec_offset = offset
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                if not chained:
+                    legacy.update(raw)
+                continue
+            count += 1
+            checked += 1
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                rec = None
+                issue = f"Malformed JSON in record {count} at byte {rec_offset}"
+            else:
+                issue = f"Record {count} at byte {rec_offset} is not a JSON object"
+            if not chained and not (isinstance(rec, dict) and ledger.CHAIN_FIELD in rec):
+                if isinstance(rec, dict):
+                    issue = f"Record {count} at byte {rec_offset} has no chain hash"
+                pending.append(issue)
+                legacy.update(raw)
+                continue
+            if not isinstance(rec, dict):
+                problems.append(issue)
+                continue
+            if not chained:
+                chained = True
+                seal = rec.get(ledger.SEAL_FIELD)
+                if pending and isinstance(seal, dict) and seal.get("records") == len(pending):
+                    prev_hash = legacy.hexdigest()
+                else:
+                    problems.extend(pending)
+            expected = ledger.chain_hash(prev_hash, rec)
+            stored = rec.get(ledger.CHAIN_FIELD)
+            if stored is None:
+                problems.append(f"Record {count} at byte {rec_offset} has no chain hash")
+            elif not isinstance(stored, str):
+                problems.append(f"Record {count} at byte {rec_offset} has a non-string chain hash")
+                stored = None
+            elif stored != expected:
+                problems.append(f"Chain hash mismatch in record {count} at byte {rec_offset}")
+            # Continue from the stored hash so one edit is reported once.
+            prev_hash = stored or expected
+
+    if not chained:
+        problems.extend(pending)
+
+    new_cp = None
+    if not problems and checkpoint and checked:
+        new_cp = write_checkpoint(offset, count, prev_hash, path, key=key)
+
+    return AuditResult(
+        ok=not problems,
+        start_offset=start_offset,
+        end_offset=offset,
+        records_checked=checked,
+        total_records=count,
+        chain_hash=prev_hash,
+        problems=problems,
+        checkpoint=new_cp,
+    )
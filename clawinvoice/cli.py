@@ -1,7 +1,8 @@
-"""ClawInvoice CLI – typer application with create / verify / status / deliver."""
+"""ClawInvoice CLI – typer application with create / verify / status / deliver / audit / seal."""
 
 from __future__ import annotations
 
+import dataclasses
 import json
 import time
 import uuid
@@ -9,6 +10,7 @@ import uuid
 import typer
 
 from clawinvoice import ledger
+from clawinvoice.audit import audit_ledger
 from clawinvoice.verify import (
     PaymentVerificationError,
     fetch_usdc_transfer,
@@ -22,6 +24,15 @@ def _print_json(data: dict) -> None:
     typer.echo(json.dumps(data, indent=2))
 
 
+def _append_or_exit(record: dict) -> dict:
+    """Append *record* to the ledger, or print the error and exit 1."""
+    try:
+        return ledger.append_record(record)
+    except ValueError as exc:
+        _print_json({"error": str(exc), "invoice_id": record.get("invoice_id")})
+        raise typer.Exit(code=1)
+
+
 # ---------------------------------------------------------------------------
 # create
 # ---------------------------------------------------------------------------
@@ -45,7 +56,7 @@ def create(
         "tx": None,
         "proof_url": None,
     }
-    ledger.append_record(record)
+    record = _append_or_exit(record)
     _print_json(record)
 
 
@@ -63,6 +74,14 @@ def verify(
         _print_json({"error": "invoice not found", "invoice_id": invoice_id})
         raise typer.Exit(code=1)
 
+    # Refuse before the RPC call so a confirmed payment is never dropped
+    # because the ledger cannot record it.
+    try:
+        ledger.check_appendable()
+    except ValueError as exc:
+        _print_json({"error": str(exc), "invoice_id": invoice_id})
+        raise typer.Exit(code=1)
+
     # Attempt on-chain verification via RPC
     try:
         transfer = fetch_usdc_transfer(tx)
@@ -85,7 +104,7 @@ def verify(
     rec["paid_at"] = transfer.block_ts
     rec["verified_amount"] = transfer.usdc_amount
     rec["verified_recipient"] = transfer.recipient
-    ledger.append_record(rec)
+    rec = _append_or_exit(rec)
 
     _print_json({
         "invoice_id": rec["invoice_id"],
@@ -127,7 +146,35 @@ def deliver(
         raise typer.Exit(code=1)
     rec["status"] = "delivered"
     rec["proof_url"] = proof_url
-    ledger.append_record(rec)
+    rec = _append_or_exit(rec)
+    _print_json(rec)
+
+
+# ---------------------------------------------------------------------------
+# audit
+# ---------------------------------------------------------------------------
+@app.command()
+def audit(
+    full: bool = typer.Option(False, "--full", help="Ignore checkpoints and re-hash the whole ledger"),
+) -> None:
+    """Verify the ledger hash chain from the last trusted checkpoint."""
+    result = audit_ledger(full=full)
+    _print_json(dataclasses.asdict(result))
+    if not result.ok:
+        raise typer.Exit(code=1)
+
+
+# ---------------------------------------------------------------------------
+# seal
+# ---------------------------------------------------------------------------
+@app.command()
+def seal() -> None:
+    """Start the hash chain on a ledger written before chaining existed."""
+    try:
+        rec = ledger.seal_legacy()
+    except ValueError as exc:
+        _print_json({"error": str(exc)})
+        raise typer.Exit(code=1)
     _print_json(rec)
 
 
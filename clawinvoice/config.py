@@ -26,3 +26,6 @@ except ValueError as exc:
 
 DATA_DIR: Path = _PROJECT_ROOT / "data"
 LEDGER_PATH: Path = Path(os.getenv("LEDGER_PATH", str(DATA_DIR / "ledger.jsonl")))
+
+# Optional HMAC key used to sign audit checkpoints; unsigned when unset.
+LEDGER_AUDIT_KEY: str | None = os.getenv("LEDGER_AUDIT_KEY") or None
@@ -1,13 +1,41 @@
-"""JSONL ledger helpers – append / read / query invoice records."""
+"""JSONL ledger helpers – append / read / query invoice records.
+
+Every appended record carries a ``chain_hash``: the SHA-256 of the previous
+record's chain hash followed by the record's canonical JSON.  Appends only
+read the tail of the file to find the previous hash, so they stay O(1) in
+ledger size, and hold an exclusive file lock so concurrent writers cannot
+fork the chain; see ``clawinvoice.audit`` for verification.
+
+Ledgers written before chaining existed must be sealed once with
+``seal_legacy``: it appends a record whose chain starts from the SHA-256 of
+every byte before it.  Until then ``append_record`` refuses to extend an
+unchained tail rather than silently restarting the chain.
+"""
 
 from __future__ import annotations
 
+import contextlib
+import hashlib
 import json
+import os
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Iterator
 
 from clawinvoice.config import LEDGER_PATH
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+CHAIN_FIELD = "chain_hash"
+SEAL_FIELD = "legacy_seal"
+GENESIS_HASH = "0" * 64
+
+# Bytes read per step when scanning backwards for the last line.
+_TAIL_CHUNK = 4096
+
 
 def _ensure_file(path: Path = LEDGER_PATH) -> Path:
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -16,11 +44,135 @@ def _ensure_file(path: Path = LEDGER_PATH) -> Path:
     return path
 
 
-def append_record(record: dict[str, Any], path: Path = LEDGER_PATH) -> None:
-    """Append a single JSON record as one line."""
+@contextlib.contextmanager
+def locked(fh: IO[Any], *, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on *fh* for the duration of the block.
+
+    Uses ``flock`` on POSIX.  On Windows ``msvcrt`` has no shared mode, so
+    the first byte is locked exclusively either way.
+    """
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            # Flush buffered writes before other writers can read the tail.
+            fh.flush()
+            fcntl.flock(fh, fcntl.LOCK_UN)
+        return
+    pos = fh.tell()
+    fh.seek(0)
+    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+    fh.seek(pos)
+    try:
+        yield
+    finally:
+        fh.flush()
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_last_line(fh: IO[bytes], end: int | None = None) -> bytes:
+    """Return the last non-blank line before byte *end* (default: EOF)."""
+    pos = fh.seek(0, os.SEEK_END) if end is None else end
+    buf = b""
+    while pos > 0:
+        step = min(_TAIL_CHUNK, pos)
+        pos -= step
+        fh.seek(pos)
+        buf = fh.read(step) + buf
+        stripped = buf.rstrip()
+        idx = stripped.rfind(b"\n")
+        if idx != -1:
+            return stripped[idx + 1:].strip()
+    return buf.strip()
+
+
+def chain_hash(prev_hash: str, record: dict[str, Any]) -> str:
+    """Return the chain hash linking *record* to *prev_hash*."""
+    body = {k: v for k, v in record.items() if k != CHAIN_FIELD}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(prev_hash.encode() + canonical.encode()).hexdigest()
+
+
+def _tail_hash(line: bytes, path: Path) -> str:
+    """Return the chain hash to link after *line*, the ledger's last line."""
+    if not line:
+        return GENESIS_HASH
+    try:
+        tail = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(
+            f"Malformed JSON on last line of ledger file {path}"
+        ) from exc
+    prev_hash = tail.get(CHAIN_FIELD) if isinstance(tail, dict) else None
+    if not isinstance(prev_hash, str):
+        raise ValueError(
+            f"Ledger file {path} ends with an unchained record; "
+            f"run `clawinvoice seal` before appending"
+        )
+    return prev_hash
+
+
+def check_appendable(path: Path = LEDGER_PATH) -> None:
+    """Raise ``ValueError`` if ``append_record`` would refuse to write to *path*."""
+    if not path.exists():
+        return
+    with path.open("rb") as fh:
+        _tail_hash(read_last_line(fh), path)
+
+
+def append_record(record: dict[str, Any], path: Path = LEDGER_PATH) -> dict[str, Any]:
+    """Append a single JSON record as one line and return it with its chain hash.
+
+    Any ``chain_hash`` already present on *record* (e.g. from ``find_by_id``)
+    is replaced.  Raises ``ValueError`` if the ledger ends with an unchained
+    or malformed record.
+    """
     _ensure_file(path)
-    with path.open("a") as fh:
-        fh.write(json.dumps(record) + "\n")
+    body = {k: v for k, v in record.items() if k != CHAIN_FIELD}
+    # "a+b" allows reading the tail while guaranteeing writes land at EOF.
+    # The exclusive lock spans tail read and write so concurrent appends
+    # cannot link to the same previous hash and fork the chain.
+    with path.open("a+b") as fh, locked(fh):
+        prev_hash = _tail_hash(read_last_line(fh), path)
+        chained = {**body, CHAIN_FIELD: chain_hash(prev_hash, body)}
+        fh.write((json.dumps(chained) + "\n").encode())
+    return chained
+
+
+def seal_legacy(path: Path = LEDGER_PATH) -> dict[str, Any]:
+    """Start the hash chain on a ledger that only holds unchained records.
+
+    Appends a seal record chained from the SHA-256 of all preceding bytes,
+    so the legacy records are covered by every later audit.  Raises
+    ``ValueError`` if the ledger is empty or already chained.
+    """
+    _ensure_file(path)
+    with path.open("a+b") as fh, locked(fh):
+        fh.seek(0)
+        data = fh.read()
+        records = 0
+        for line in data.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            records += 1
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(rec, dict) and CHAIN_FIELD in rec:
+                raise ValueError(f"Ledger file {path} is already chained")
+        if not records:
+            raise ValueError(f"Ledger file {path} has no records to seal")
+        if not data.endswith(b"\n"):
+            fh.write(b"\n")
+            data += b"\n"
+        body = {SEAL_FIELD: {"records": records, "bytes": len(data)}}
+        sealed = {**body, CHAIN_FIELD: chain_hash(hashlib.sha256(data).hexdigest(), body)}
+        fh.write((json.dumps(sealed) + "\n").encode())
+    return sealed
 
 
 def read_all(path: Path = LEDGER_PATH) -> list[dict[str, Any]]:
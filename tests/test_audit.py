@@ -0,0 +1,296 @@
+"""Tests for clawinvoice.audit – hash-chain verification and checkpoints."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from clawinvoice import ledger
+from clawinvoice.audit import audit_ledger, checkpoint_path, load_checkpoint
+
+
+def _build_ledger(tmp_path: Path, n: int = 3) -> Path:
+    path = tmp_path / "ledger.jsonl"
+    for i in range(n):
+        ledger.append_record({"invoice_id": f"inv{i}", "amount": i + 0.5}, path=path)
+    return path
+
+
+def _rewrite_line(path: Path, index: int, **changes) -> None:
+    lines = path.read_text().splitlines()
+    rec = json.loads(lines[index])
+    rec.update(changes)
+    lines[index] = json.dumps(rec)
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_empty_ledger_passes(tmp_path: Path) -> None:
+    result = audit_ledger(tmp_path / "ledger.jsonl", key=None)
+    assert result.ok
+    assert result.records_checked == 0
+    assert result.checkpoint is None
+
+
+def test_intact_ledger_writes_checkpoint(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    result = audit_ledger(path, key=None)
+    assert result.ok, result.problems
+    assert result.records_checked == 3
+    assert result.end_offset == path.stat().st_size
+    cp = load_checkpoint(path)
+    assert cp is not None
+    assert cp.count == 3
+    assert cp.chain_hash == ledger.read_all(path)[-1]["chain_hash"]
+
+
+def test_incremental_audit_checks_only_new_records(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    first = audit_ledger(path, key=None)
+    ledger.append_record({"invoice_id": "inv3"}, path=path)
+    second = audit_ledger(path, key=None)
+    assert second.ok, second.problems
+    assert second.start_offset == first.end_offset
+    assert second.records_checked == 1
+    assert second.total_records == 4
+
+
+def test_edited_record_detected(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    _rewrite_line(path, 1, amount=999)
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert len(result.problems) == 1
+    assert "record 2" in result.problems[0]
+    assert not checkpoint_path(path).exists()
+
+
+def test_rewrite_under_checkpoint_detected(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    audit_ledger(path, key=None)
+    lines = path.read_text().splitlines()
+    # Recompute the last hash so only the checkpoint can catch the edit.
+    rec = json.loads(lines[-1])
+    rec["amount"] = 999
+    prev = json.loads(lines[-2])["chain_hash"]
+    rec["chain_hash"] = ledger.chain_hash(prev, rec)
+    lines[-1] = json.dumps(rec)
+    path.write_text("\n".join(lines) + "\n")
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert any("checkpoint" in p for p in result.problems)
+    assert audit_ledger(path, full=True, key=None).ok
+
+
+def test_truncation_detected(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    audit_ledger(path, key=None)
+    path.write_text(path.read_text().splitlines(keepends=True)[0])
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert "truncated" in result.problems[0]
+    # Counts and hash describe the truncated file, not the checkpoint.
+    assert result.start_offset == 0
+    assert result.total_records == 1
+    assert result.chain_hash == ledger.read_all(path)[0]["chain_hash"]
+
+
+def test_signed_checkpoint_required_with_key(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    audit_ledger(path, key=None)  # unsigned checkpoint
+    result = audit_ledger(path, key="secret")
+    assert not result.ok
+    assert "unsigned" in result.problems[0]
+    assert result.start_offset == 0
+
+
+def test_signed_checkpoint_round_trip(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    first = audit_ledger(path, full=True, key="secret")
+    assert first.checkpoint is not None and first.checkpoint.signature
+    assert audit_ledger(path, key="secret").start_offset == first.end_offset
+    assert not audit_ledger(path, key="other").ok
+
+
+def _append_raw(path: Path, line: str) -> None:
+    with path.open("a") as fh:
+        fh.write(line + "\n")
+
+
+def test_non_object_records_reported(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path, n=1)
+    _append_raw(path, "5")
+    _append_raw(path, "[1]")
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert result.total_records == 3
+    assert sum("not a JSON object" in p for p in result.problems) == 2
+
+
+def test_non_string_chain_hash_reported(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path, n=2)
+    _rewrite_line(path, 0, chain_hash=5)
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert "non-string chain hash" in result.problems[0]
+    # The next record is checked against the recomputed hash, not 5.
+    assert len(result.problems) == 1
+
+
+def test_non_object_anchor_reported(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path, n=2)
+    audit_ledger(path, key=None)
+    lines = path.read_text().splitlines()
+    # Same length keeps the checkpoint offset on the line boundary.
+    lines[-1] = "[" + "0" * (len(lines[-1]) - 2) + "]"
+    path.write_text("\n".join(lines) + "\n")
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert any("checkpoint" in p for p in result.problems)
+
+
+def test_malformed_checkpoint_falls_back_to_full_audit(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    checkpoint_path(path).write_text('{"offset": 1}\n')
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert "Unreadable checkpoint" in result.problems[0]
+    assert result.start_offset == 0
+    assert result.records_checked == 3
+
+
+def test_non_string_signature_rejected(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    cp = audit_ledger(path, full=True, key="secret").checkpoint
+    assert cp is not None
+    data = {**dataclasses.asdict(cp), "signature": 5}
+    _append_raw(checkpoint_path(path), json.dumps(data))
+    result = audit_ledger(path, key="secret")
+    assert not result.ok
+    assert "non-string signature" in result.problems[0]
+    assert result.start_offset == 0
+
+
+def _append_many(path: Path, worker: int, n: int) -> None:
+    for i in range(n):
+        ledger.append_record({"invoice_id": f"w{worker}-{i}"}, path=path)
+
+
+def test_concurrent_appends_keep_chain_intact(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.jsonl"
+    procs = [
+        multiprocessing.Process(target=_append_many, args=(path, w, 50))
+        for w in range(4)
+    ]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    result = audit_ledger(path, key=None)
+    assert result.ok, result.problems
+    assert result.total_records == 200
+
+
+def _legacy_ledger(tmp_path: Path) -> Path:
+    path = tmp_path / "ledger.jsonl"
+    path.write_text('{"invoice_id": "old1"}\n\n{"invoice_id": "old2"}')
+    return path
+
+
+def test_append_refuses_unchained_tail(tmp_path: Path) -> None:
+    path = _legacy_ledger(tmp_path)
+    with pytest.raises(ValueError, match="clawinvoice seal"):
+        ledger.append_record({"invoice_id": "new"}, path=path)
+
+
+def test_unsealed_legacy_ledger_fails_audit(tmp_path: Path) -> None:
+    path = _legacy_ledger(tmp_path)
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert len(result.problems) == 2
+
+
+def test_sealed_legacy_ledger_passes_audit(tmp_path: Path) -> None:
+    path = _legacy_ledger(tmp_path)
+    seal = ledger.seal_legacy(path)
+    assert seal[ledger.SEAL_FIELD]["records"] == 2
+    ledger.append_record({"invoice_id": "new"}, path=path)
+    result = audit_ledger(path, key=None)
+    assert result.ok, result.problems
+    assert result.total_records == 4
+    with pytest.raises(ValueError, match="already chained"):
+        ledger.seal_legacy(path)
+
+
+def test_edited_legacy_record_breaks_seal(tmp_path: Path) -> None:
+    path = _legacy_ledger(tmp_path)
+    ledger.seal_legacy(path)
+    path.write_text(path.read_text().replace("old1", "evil"))
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert any("mismatch in record 3" in p for p in result.problems)
+
+
+def _forge_chain(path: Path, index: int, **changes) -> None:
+    """Edit one record and recompute every chain hash after it."""
+    _rewrite_line(path, index, **changes)
+    prev = ledger.GENESIS_HASH
+    lines = []
+    for line in path.read_text().splitlines():
+        rec = json.loads(line)
+        rec["chain_hash"] = prev = ledger.chain_hash(prev, rec)
+        lines.append(json.dumps(rec))
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_deleted_checkpoint_rejected_with_key(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    assert audit_ledger(path, full=True, key="k").ok
+    _forge_chain(path, 0, amount=999)
+    checkpoint_path(path).unlink()
+    result = audit_ledger(path, key="k")
+    assert not result.ok
+    assert "No trusted checkpoint" in result.problems[0]
+    assert result.checkpoint is None
+    assert not checkpoint_path(path).exists()
+
+
+def test_full_audit_establishes_trust_with_key(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    assert not audit_ledger(path, key="k").ok
+    assert audit_ledger(path, full=True, key="k").ok
+    assert audit_ledger(path, key="k").ok
+
+
+def test_null_checkpoint_line_is_malformed(tmp_path: Path) -> None:
+    path = _build_ledger(tmp_path)
+    checkpoint_path(path).write_text("null\n")
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert "Unreadable checkpoint" in result.problems[0]
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"chain_hash": None},
+        {"chain_hash": "xyz"},
+        {"offset": 10.7},
+        {"offset": True},
+        {"count": "3"},
+        {"created_at": -1},
+    ],
+)
+def test_loosely_typed_checkpoint_rejected(tmp_path: Path, changes: dict) -> None:
+    path = _build_ledger(tmp_path)
+    cp = audit_ledger(path, key=None).checkpoint
+    assert cp is not None
+    data = {**dataclasses.asdict(cp), **changes}
+    _append_raw(checkpoint_path(path), json.dumps(data))
+    result = audit_ledger(path, key=None)
+    assert not result.ok
+    assert "Unreadable checkpoint" in result.problems[0]
+    assert result.start_offset == 0
@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import functools
 import json
 from pathlib import Path
+from unittest.mock import MagicMock
 
 from typer.testing import CliRunner
 
 from clawinvoice.cli import app
 from clawinvoice import ledger
+from clawinvoice import cli
+from clawinvoice.audit import audit_ledger
 
 runner = CliRunner()
 
@@ -42,6 +46,15 @@ def test_find_by_id_missing(tmp_path: Path) -> None:
     assert ledger.find_by_id("nope", path=path) is None
 
 
+def test_append_chains_records(tmp_path: Path) -> None:
+    path = _tmp_ledger(tmp_path)
+    first = ledger.append_record({"id": "a"}, path=path)
+    second = ledger.append_record({"id": "b", "chain_hash": "stale"}, path=path)
+    assert first["chain_hash"] == ledger.chain_hash(ledger.GENESIS_HASH, {"id": "a"})
+    assert second["chain_hash"] == ledger.chain_hash(first["chain_hash"], {"id": "b"})
+    assert ledger.read_all(path=path)[-1] == second
+
+
 # -- CLI commands ------------------------------------------------------------
 
 def test_cli_help() -> None:
@@ -51,6 +64,7 @@ def test_cli_help() -> None:
     assert "verify" in result.output
     assert "status" in result.output
     assert "deliver" in result.output
+    assert "audit" in result.output
 
 
 def test_cli_create() -> None:
@@ -67,3 +81,92 @@ def test_cli_status_not_found() -> None:
     assert result.exit_code == 1
     data = json.loads(result.output)
     assert data["error"] == "invoice not found"
+
+
+def test_cli_audit(tmp_path: Path, monkeypatch) -> None:
+    path = _tmp_ledger(tmp_path)
+    monkeypatch.setattr(cli, "audit_ledger", functools.partial(audit_ledger, path, key=None))
+    ledger.append_record({"invoice_id": "a", "amount": 1.0}, path=path)
+    ledger.append_record({"invoice_id": "b", "amount": 2.0}, path=path)
+
+    result = runner.invoke(app, ["audit"])
+    assert result.exit_code == 0
+    data = json.loads(result.output)
+    assert data["ok"] is True
+    assert data["records_checked"] == 2
+
+    path.write_text(path.read_text().replace('"amount": 1.0', '"amount": 9.0'))
+    # The incremental audit trusts records behind the checkpoint anchor;
+    # --full re-hashes everything and catches the edit.
+    assert runner.invoke(app, ["audit"]).exit_code == 0
+    result = runner.invoke(app, ["audit", "--full"])
+    assert result.exit_code == 1
+    data = json.loads(result.output)
+    assert data["ok"] is False
+    assert data["start_offset"] == 0
+    assert any("record 1" in p for p in data["problems"])
+
+
+def test_cli_seal(tmp_path: Path, monkeypatch) -> None:
+    path = _tmp_ledger(tmp_path)
+    path.write_text('{"invoice_id": "old"}\n')
+    monkeypatch.setattr(ledger, "seal_legacy", functools.partial(ledger.seal_legacy, path))
+
+    result = runner.invoke(app, ["seal"])
+    assert result.exit_code == 0
+    assert json.loads(result.output)[ledger.SEAL_FIELD]["records"] == 1
+
+    result = runner.invoke(app, ["seal"])
+    assert result.exit_code == 1
+    assert "already chained" in json.loads(result.output)["error"]
+
+
+def test_cli_audit_reports_tampered_tail(tmp_path: Path, monkeypatch) -> None:
+    path = _tmp_ledger(tmp_path)
+    monkeypatch.setattr(cli, "audit_ledger", functools.partial(audit_ledger, path, key=None))
+    ledger.append_record({"invoice_id": "a", "amount": 1.0}, path=path)
+    with path.open("a") as fh:
+        fh.write("5\n")
+
+    result = runner.invoke(app, ["audit"])
+    assert result.exit_code == 1
+    data = json.loads(result.output)
+    assert data["ok"] is False
+    assert "not a JSON object" in data["problems"][0]
+
+
+def _use_legacy_ledger(tmp_path: Path, monkeypatch) -> Path:
+    path = _tmp_ledger(tmp_path)
+    path.write_text('{"invoice_id": "old", "amount": 1.0, "status": "pending"}\n')
+    for name in ("append_record", "find_by_id", "check_appendable"):
+        monkeypatch.setattr(ledger, name, functools.partial(getattr(ledger, name), path=path))
+    return path
+
+
+def test_cli_create_on_legacy_ledger(tmp_path: Path, monkeypatch) -> None:
+    path = _use_legacy_ledger(tmp_path, monkeypatch)
+    result = runner.invoke(app, ["create", "--amount", "1"])
+    assert result.exit_code == 1
+    assert "clawinvoice seal" in json.loads(result.output)["error"]
+    assert len(ledger.read_all(path=path)) == 1
+
+
+def test_cli_deliver_on_legacy_ledger(tmp_path: Path, monkeypatch) -> None:
+    _use_legacy_ledger(tmp_path, monkeypatch)
+    result = runner.invoke(
+        app, ["deliver", "--invoice-id", "old", "--proof-url", "https://x"]
+    )
+    assert result.exit_code == 1
+    data = json.loads(result.output)
+    assert data["invoice_id"] == "old"
+    assert "clawinvoice seal" in data["error"]
+
+
+def test_cli_verify_on_legacy_ledger_skips_rpc(tmp_path: Path, monkeypatch) -> None:
+    _use_legacy_ledger(tmp_path, monkeypatch)
+    fetch = MagicMock()
+    monkeypatch.setattr(cli, "fetch_usdc_transfer", fetch)
+    result = runner.invoke(app, ["verify", "--invoice-id", "old", "--tx", "0xabc"])
+    assert result.exit_code == 1
+    assert "clawinvoice seal" in json.loads(result.output)["error"]
+    fetch.assert_not_called()